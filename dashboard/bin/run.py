@@ -1,6 +1,8 @@
 #! /usr/bin/env python3
 
-import json
+import csv
+import gzip
+import http.client
 import os
 import random
 import shutil
@@ -8,41 +10,123 @@ import subprocess
 import sys
 import time
 import traceback
-import urllib.request
 import urllib.parse
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from math import log
-from typing import Any, Optional
-from xml.etree.ElementTree import Element, SubElement, tostring
+from typing import Any, NamedTuple, Optional
+from xml.sax.saxutils import escape
+
+# Prefer a faster JSON parser when one is installed, the payloads can be large
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from ujson import loads as json_loads
+    except ImportError:
+        from json import loads as json_loads
+
+# Pillow is optional, without it graphs are rendered through rsvg-convert
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
 
 # IoTaWatt device API URL (Change this to match your device IP)
 # IOTAWATT_ADDRESS = "http://iotawatt.local"
 IOTAWATT_ADDRESS = "http://192.168.128.5"
 LOGARITHMIC = False
+# Seconds before the sensor data and the list of series are fetched again,
+# so back to back cycles don't re-query the device for the same data
+SENSOR_DATA_TTL = 60
+SERIES_TTL = 60 * 60
+# Seconds to wait on the IoTaWatt before giving up on a query
+HTTP_TIMEOUT = 30
+# Also write the intermediate SVGs next to the PNGs
+KEEP_SVG = bool(os.environ.get("IOTAWATT_KEEP_SVG"))
 
 
-@dataclass
-class Region:
+class Region(NamedTuple):
     min_x: float
     min_y: float
     max_x: float
     max_y: float
 
 
-def get(query: str, params: dict[str, Any]):
-    url = f"{IOTAWATT_ADDRESS}/{query}"
+# Shared time column and per-sensor value column
+Series = tuple[list[float], list[float]]
+
+
+@lru_cache(maxsize=1)
+def get_connection() -> http.client.HTTPConnection:
+    # Kept open between queries so each one skips the TCP handshake
+    address = urllib.parse.urlsplit(IOTAWATT_ADDRESS)
+    if address.scheme == "https":
+        return http.client.HTTPSConnection(address.netloc, timeout=HTTP_TIMEOUT)
+    return http.client.HTTPConnection(address.netloc, timeout=HTTP_TIMEOUT)
+
+
+def get_raw(query: str, params: dict[str, Any]) -> bytes:
+    url = f"{urllib.parse.urlsplit(IOTAWATT_ADDRESS).path.rstrip('/')}/{query}"
     if params:
         query_str = urllib.parse.urlencode(params)
         url = f"{url}?{query_str}"
 
-    with urllib.request.urlopen(url) as response:
-        return json.loads(response.read())
+    connection = get_connection()
+    for attempt in range(2):
+        try:
+            connection.request("GET", url, headers={"Accept-Encoding": "gzip"})
+            response = connection.getresponse()
+            body = response.read()
+            break
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # The device may have dropped the idle keep-alive connection, reconnect and retry once
+            connection.close()
+            if attempt > 0:
+                raise
+        except (http.client.HTTPException, OSError):
+            # Timeouts and other failures aren't retried, but reset the connection
+            # so the next query doesn't trip over a half read response
+            connection.close()
+            raise
+
+    if response.status != 200:
+        raise Exception(f"Query {query} failed: {response.status} {response.reason}")
+
+    if response.getheader("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+
+    return body
 
 
-def get_iotawatt_sensor_data() -> dict[str, list[tuple[float, float]]]:
+def get(query: str, params: dict[str, Any]):
+    return json_loads(get_raw(query, params))
+
+
+def parse_csv(body: bytes) -> dict[str, Any]:
+    """Parse a CSV query into the same shape as the JSON format."""
+    label, *rows = csv.reader(body.decode().splitlines())
+    return {"labels": label, "data": [list(map(float, row)) for row in rows if row]}
+
+
+@lru_cache(maxsize=1)
+def get_iotawatt_sources(epoch: int) -> list[str]:
+    # The device's series rarely change, epoch only exists to expire this cache
     series = get("query", {"show": "series"})
+    return [f"{x['name']}.Watts.d1" for x in series["series"] if x["unit"] == "Watts"]
+
+
+_sensor_data_cache: Optional[tuple[float, dict[str, Series]]] = None
+
+
+def get_iotawatt_sensor_data() -> dict[str, Series]:
+    global _sensor_data_cache
+
+    now = time.monotonic()
+    if _sensor_data_cache is not None and now - _sensor_data_cache[0] < SENSOR_DATA_TTL:
+        return _sensor_data_cache[1]
 
     params = {
         # Last 24 hours
@@ -50,17 +134,20 @@ def get_iotawatt_sensor_data() -> dict[str, list[tuple[float, float]]]:
         # Until now
         "end": "s",
         "group": "auto",
-        "format": "json",
+        # CSV is cheaper to parse than the equivalent JSON on the Kindle
+        "format": "csv",
         "resolution": "high",
         "header": "yes",
     }
 
-    sources = [f"{x['name']}.Watts.d1" for x in series["series"] if x["unit"] == "Watts"]
+    sources = get_iotawatt_sources(int(now // SERIES_TTL))
     params["select"] = "[time.utc.unix," + ",".join(sources) + "]"
 
-    sensor_data = get("query", params)
+    sensor_data = parse_csv(get_raw("query", params))
 
-    return convert_sensor_data(sensor_data)
+    data = convert_sensor_data(sensor_data)
+    _sensor_data_cache = (now, data)
+    return data
 
 
 def normalise(value: float, min_val: float, max_val: float, new_min: float, new_max: float) -> float:
@@ -68,14 +155,8 @@ def normalise(value: float, min_val: float, max_val: float, new_min: float, new_
     return new_min + (value - min_val) * (new_max - new_min) / (max_val - min_val)
 
 
-def scale_y(value: float) -> float:
-    if LOGARITHMIC:
-        return log(value)
-    return value
-
-
-# List of sensors each reporting a list of (time, value) points
-def convert_sensor_data(data: dict[str, Any]) -> dict[str, list[tuple[float, float]]]:
+# List of sensors each reporting a (times, values) pair of columns
+def convert_sensor_data(data: dict[str, Any]) -> dict[str, Series]:
     label: list[str] = data["labels"]
     sensor_data: list[list[float]] = data["data"]
 
@@ -83,89 +164,83 @@ def convert_sensor_data(data: dict[str, Any]) -> dict[str, list[tuple[float, flo
     if label[0] != "Time":
         raise Exception("Time not first element")
 
-    first_len = len(sensor_data[0])
-    if all(len(sublist) == first_len for sublist in sensor_data) is False:
+    if len(set(map(len, sensor_data))) > 1:
         raise Exception("Data not all at the same length")
 
-    points: list[list[tuple[float, float]]] = []
-    for i in range(1, len(sensor_data[0])):
-        plist: list[tuple[float, float]] = []
-        for p in sensor_data:
-            x = p[0]
-            y = scale_y(p[i])
-            plist.append((x, y))
-        points.append(plist)
+    # Transpose rows into columns in a single pass rather than walking every cell.
+    # These stay plain float lists: without NumPy a packed array boxes a new
+    # float on every read, and float32 can't hold Unix timestamps.
+    times, *columns = map(list, zip(*sensor_data))
 
-    return {a: b for a, b in zip(label[1:], points)}
+    # Decide on the scale once rather than per value
+    if LOGARITHMIC:
+        columns = [list(map(log, b)) for b in columns]
 
+    return {a: (times, b) for a, b in zip(label[1:], columns)}
 
-def get_data_region(data: dict[str, list[tuple[float, float]]]):
-    all_points = [point for points in data.values() for point in points]
+
+def get_data_region(data: dict[str, Series]):
+    # Reduce each column directly rather than flattening every point into one list.
+    # Sensors share the same time column, so it only needs reducing once.
+    xs, _ = next(iter(data.values()))
     return Region(
-        min_x=min(x for x, _ in all_points),
-        max_x=max(x for x, _ in all_points),
-        min_y=min(y for _, y in all_points),
-        max_y=max(y for _, y in all_points),
+        min_x=min(xs),
+        max_x=max(xs),
+        min_y=min(min(ys) for _, ys in data.values()),
+        max_y=max(max(ys) for _, ys in data.values()),
     )
 
 
 def normalise_data(
-    data: dict[str, list[tuple[float, float]]],
+    data: dict[str, Series],
     data_region: Region,
     draw_region: Region,
-) -> dict[str, list[tuple[float, float]]]:
-    return {
-        key: [
-            (
-                normalise(
-                    x,
-                    data_region.min_x,
-                    data_region.max_x,
-                    draw_region.min_x,
-                    draw_region.max_x,
-                ),
-                normalise(
-                    y,
-                    data_region.min_y,
-                    data_region.max_y,
-                    draw_region.min_y,
-                    draw_region.max_y,
-                ),
-            )
-            for x, y in points
-        ]
-        for key, points in data.items()
-    }
-
-
-# Generate an SVG graph
-def generate_svg(
-    data: dict[str, Any],
+) -> dict[str, Series]:
+    # Hoist the scale factors out of the per-point loop
+    sx = (draw_region.max_x - draw_region.min_x) / (data_region.max_x - data_region.min_x)
+    sy = (draw_region.max_y - draw_region.min_y) / (data_region.max_y - data_region.min_y)
+    dx, dy = data_region.min_x, data_region.min_y
+    rx, ry = draw_region.min_x, draw_region.min_y
+
+    normalised: dict[str, Series] = {}
+    xs_out: list[float] = []
+    last_xs = None
+    for key, (xs, ys) in data.items():
+        # Sensors share the same time column, so only transform it once
+        if xs is not last_xs:
+            xs_out = [(x - dx) * sx + rx for x in xs]
+            last_xs = xs
+        normalised[key] = (xs_out, [(y - dy) * sy + ry for y in ys])
+    return normalised
+
+
+# Normalised data and layout shared by every graph rendered from one dataset
+@dataclass
+class Plot:
+    # Screen coordinates for each source
+    lines: dict[str, Series]
+    draw_region: Region
+    y_highlight: float
+    width: int
+    height: int
+    padding: int
+    highlight_power: float
+
+    # Formatted SVG polyline points for each source, only built when the SVG
+    # path needs them and then shared by every graph that draws the source
+    @cached_property
+    def points(self) -> dict[str, str]:
+        point_format = "{:0.2f},{:0.2f}".format
+        return {key: " ".join(map(point_format, xs, ys)) for key, (xs, ys) in self.lines.items()}
+
+
+def prepare_plot(
+    data: dict[str, Series],
     width: int = 1448,
     height: int = 1072,
     padding: int = 50,
-    invert: Optional[bool] = None,
     highlight_power: float = 1000,
-    invert_highlight: Optional[bool] = None,
-    only_source: Optional[str] = None,
-    normalise_before_filter: bool = True,
-    rotate: bool = True,
-):
-    if invert is None:
-        invert = random.choice([True, False])
-    if invert_highlight is None:
-        invert_highlight = random.choice([True, False])
-
-    foreground = "white" if invert else "black"
-    background = "black" if invert else "white"
-
-    if only_source is not None and only_source not in data:
-        print(f"Ignoring request to filter non-existent field: {only_source}")
-        only_source = None
-
-    if only_source and normalise_before_filter is False:
-        data = {only_source: data[only_source]}
-
+) -> Plot:
     data_region = get_data_region(data)
 
     draw_region = Region(
@@ -177,153 +252,319 @@ def generate_svg(
 
     # Draw a rectangle that identifies the 1kw+ region
     y_highlight = normalise(
-        scale_y(highlight_power),
+        log(highlight_power) if LOGARITHMIC else highlight_power,
         data_region.min_y,
         data_region.max_y,
         draw_region.min_y,
         draw_region.max_y,
     )
-    data = normalise_data(data, data_region, draw_region)
 
-    if only_source and normalise_before_filter is True:
-        data = {only_source: data[only_source]}
+    # The screen's y axis points down, so flip the output range while
+    # normalising rather than in a separate pass
+    screen_region = Region(
+        min_x=draw_region.min_x,
+        max_x=draw_region.max_x,
+        min_y=height - draw_region.min_y,
+        max_y=height - draw_region.max_y,
+    )
+    return Plot(
+        lines=normalise_data(data, data_region, screen_region),
+        draw_region=draw_region,
+        y_highlight=y_highlight,
+        width=width,
+        height=height,
+        padding=padding,
+        highlight_power=highlight_power,
+    )
+
 
-    svg = Element("svg", width=str(width), height=str(height), xmlns="http://www.w3.org/2000/svg")
-    group = SubElement(svg, "g")
+# Title, x-axis and y-axis text shared by the SVG and Pillow renderers
+def graph_labels(highlight_power: float, only_source: Optional[str] = None) -> tuple[str, str, str]:
+    if only_source is None:
+        title = "Power consumption"
+    else:
+        title = f"Power consumption ({only_source})"
+
+    if LOGARITHMIC:
+        ylabel = f"Power (Logarithmic. Higher region {highlight_power}W)"
+    else:
+        ylabel = f"Power (Higher region {highlight_power}W)"
+
+    return title, "Time (Previous 24 hours)", ylabel
+
+
+# The parts of a graph that only depend on its layout and colours, split
+# around where the highlight and title, then the polylines, are spliced in
+@lru_cache
+def svg_chrome(
+    width: int,
+    height: int,
+    padding: int,
+    highlight_power: float,
+    foreground: str,
+    background: str,
+    rotate: bool,
+) -> tuple[str, str, str]:
     if rotate:
-        group.set("transform", f"translate(0, {width}) rotate(-90)")
-        svg.attrib["width"] = str(height)
-        svg.attrib["height"] = str(width)
+        head = (
+            f'<svg width="{height}" height="{width}" xmlns="http://www.w3.org/2000/svg">'
+            f'<g transform="translate(0, {width}) rotate(-90)">'
+        )
+    else:
+        head = f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg"><g>'
+    head += f'<rect width="{width}" height="{height}" fill="{background}" />'
 
-    SubElement(group, "rect", width=str(width), height=str(height), fill=background)
+    _, xlabel, ylabel = map(escape, graph_labels(highlight_power))
+
+    middle = "".join(
+        [
+            # X Axis
+            f'<line x1="{padding}" y1="{height - padding}" x2="{width - padding}" y2="{height - padding}" '
+            f'stroke="{foreground}" />',
+            # X-axis label
+            f'<text x="0" y="0" fill="{foreground}" '
+            f'transform="translate({width / 2 - 120}, {height - padding / 2 + 10}) scale(2)">{xlabel}</text>',
+            # Y Axis
+            f'<line x1="{padding}" y1="{padding}" x2="{padding}" y2="{height - padding}" stroke="{foreground}" />',
+            # Y-axis label (Rotated)
+            f'<text x="0" y="0" font_size="12" fill="{foreground}" '
+            f'transform="translate({padding / 2 + 10}, {height / 2 + 100}) scale(2) rotate(-90)">{ylabel}</text>',
+        ]
+    )
+
+    return head, middle, "</g></svg>"
+
+
+# Render an SVG graph from already normalised data
+def render_svg(
+    plot: Plot,
+    invert: Optional[bool] = None,
+    invert_highlight: Optional[bool] = None,
+    only_source: Optional[str] = None,
+    rotate: bool = True,
+):
+    if invert is None:
+        invert = random.choice([True, False])
+    if invert_highlight is None:
+        invert_highlight = random.choice([True, False])
+
+    foreground = "white" if invert else "black"
+    background = "black" if invert else "white"
+
+    width, height, padding = plot.width, plot.height, plot.padding
+    draw_region, y_highlight = plot.draw_region, plot.y_highlight
+
+    points = plot.points
+    if only_source is not None and only_source not in points:
+        print(f"Ignoring request to filter non-existent field: {only_source}")
+        only_source = None
+
+    if only_source:
+        points = {only_source: points[only_source]}
+
+    head, middle, tail = svg_chrome(width, height, padding, plot.highlight_power, foreground, background, rotate)
 
     if invert_highlight:
         # For "inversion" color the other half of the region instead
-        SubElement(
-            group,
-            "rect",
-            x=str(draw_region.min_x),
-            y=str(height - y_highlight),
-            width=str(draw_region.max_x - draw_region.min_x),
-            height=str(y_highlight - draw_region.min_y),
-            fill="grey",
+        highlight = (
+            f'<rect x="{draw_region.min_x}" y="{height - y_highlight}" '
+            f'width="{draw_region.max_x - draw_region.min_x}" height="{y_highlight - draw_region.min_y}" '
+            'fill="grey" />'
         )
     else:
-        SubElement(
-            group,
-            "rect",
-            x=str(draw_region.min_x),
-            y=str(draw_region.min_y),
-            width=str(draw_region.max_x - draw_region.min_x),
-            height=str(draw_region.max_y - y_highlight),
-            fill="grey",
+        highlight = (
+            f'<rect x="{draw_region.min_x}" y="{draw_region.min_y}" '
+            f'width="{draw_region.max_x - draw_region.min_x}" height="{draw_region.max_y - y_highlight}" '
+            'fill="grey" />'
         )
 
-    title = SubElement(
-        group,
-        "text",
-        x="0",
-        y="0",
-        fill=foreground,
-        transform=f"translate({width / 2 - 200}, {padding / 2 + 10}) scale(2)",
-    )
-    if only_source is None:
-        title.text = "Power consumption"
+    # Source names come from the device, so escape them
+    title = escape(graph_labels(plot.highlight_power, only_source)[0])
+
+    parts = [
+        head,
+        highlight,
+        f'<text x="0" y="0" fill="{foreground}" transform="translate({width / 2 - 200}, {padding / 2 + 10}) scale(2)">',
+        title,
+        "</text>",
+        middle,
+    ]
+
+    for points_str in points.values():
+        parts.append(f'<polyline points="{points_str}" stroke="{foreground}" fill="none" stroke_width="2" />')
+
+    parts.append(tail)
+    return "".join(parts)
+
+
+@lru_cache(maxsize=1)
+def get_font():
+    # SVG text defaults to 16px and every label is drawn at scale(2)
+    try:
+        return ImageFont.load_default(size=32)
+    except TypeError:
+        # Older Pillow only has the fixed size bitmap font
+        return ImageFont.load_default()
+
+
+def draw_text(image, x: float, y: float, text: str, fill: int, rotate: bool = False):
+    # Approximate SVG's baseline positioning with the bottom of the text
+    font = get_font()
+    _, _, w, h = font.getbbox(text)
+    mask = Image.new("L", (w, h), 0)
+    ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=font)
+    if rotate:
+        # Reads upwards from (x, y), matching the SVG's rotate(-90)
+        image.paste(fill, (int(x - h), int(y - w)), mask.transpose(Image.ROTATE_90))
     else:
-        title.text = f"Power consumption ({only_source})"
+        image.paste(fill, (int(x), int(y - h)), mask)
+
+
+# Rasterise the same graph as render_svg straight to a PNG, skipping rsvg-convert
+def render_png(
+    plot: Plot,
+    png_file: str,
+    invert: Optional[bool] = None,
+    invert_highlight: Optional[bool] = None,
+    only_source: Optional[str] = None,
+    rotate: bool = True,
+):
+    if invert is None:
+        invert = random.choice([True, False])
+    if invert_highlight is None:
+        invert_highlight = random.choice([True, False])
+
+    foreground = 255 if invert else 0
+    background = 0 if invert else 255
+    grey = 128
+
+    width, height, padding = plot.width, plot.height, plot.padding
+    draw_region, y_highlight, highlight_power = plot.draw_region, plot.y_highlight, plot.highlight_power
+
+    lines = plot.lines
+    if only_source is not None and only_source not in lines:
+        print(f"Ignoring request to filter non-existent field: {only_source}")
+        only_source = None
+
+    if only_source:
+        lines = {only_source: lines[only_source]}
+
+    image = Image.new("L", (width, height), background)
+    draw = ImageDraw.Draw(image)
+
+    if invert_highlight:
+        # For "inversion" color the other half of the region instead
+        top, bottom = height - y_highlight, height - draw_region.min_y
+    else:
+        top, bottom = draw_region.min_y, height - y_highlight
+    # Like the SVG rect, draw nothing when the highlight is outside the data
+    if bottom > top:
+        draw.rectangle([draw_region.min_x, top, draw_region.max_x, bottom], fill=grey)
+
+    title, xlabel, ylabel = graph_labels(highlight_power, only_source)
+    draw_text(image, width / 2 - 200, padding / 2 + 10, title, foreground)
 
     # X Axis
-    SubElement(
-        group,
-        "line",
-        x1=str(padding),
-        y1=str(height - padding),
-        x2=str(width - padding),
-        y2=str(height - padding),
-        stroke=foreground,
-    )
-    # X-axis label
-    xlabel = SubElement(
-        group,
-        "text",
-        x="0",
-        y="0",
-        fill=foreground,
-        transform=f"translate({width / 2 - 120}, {height - padding / 2 + 10}) scale(2)",
-    )
-    xlabel.text = "Time (Previous 24 hours)"
+    draw.line([(padding, height - padding), (width - padding, height - padding)], fill=foreground)
+    draw_text(image, width / 2 - 120, height - padding / 2 + 10, xlabel, foreground)
 
     # Y Axis
-    SubElement(
-        group,
-        "line",
-        x1=str(padding),
-        y1=str(padding),
-        x2=str(padding),
-        y2=str(height - padding),
-        stroke=foreground,
-    )
-    # Y-axis label (Rotated)
-    ylabel = SubElement(
-        group,
-        "text",
-        x="0",
-        y="0",
-        font_size="12",
-        fill=foreground,
-        transform=f"translate({padding / 2 + 10}, {height / 2 + 100}) scale(2) rotate(-90)",
-    )
-    if LOGARITHMIC:
-        ylabel.text = f"Power (Logarithmic. Higher region {highlight_power}W)"
-    else:
-        ylabel.text = f"Power (Higher region {highlight_power}W)"
+    draw.line([(padding, padding), (padding, height - padding)], fill=foreground)
+    draw_text(image, padding / 2 + 10, height / 2 + 100, ylabel, foreground, rotate=True)
+
+    for xs, ys in lines.values():
+        draw.line(list(zip(xs, ys)), fill=foreground, width=2)
+
+    if rotate:
+        image = image.transpose(Image.ROTATE_90)
+
+    image.save(png_file)
 
-    for source in data:
-        points_str = [f"{x[0]:0.2f},{(height - x[1]):0.2f}" for x in data[source]]
-        SubElement(group, "polyline", points=" ".join(points_str), stroke=foreground, fill="none", stroke_width="2")
 
-    return tostring(svg).decode()
+# The sensor data the current files were generated from
+_generated_data: Optional[dict[str, Series]] = None
 
 
 def generate_files(output_dir: str):
+    global _generated_data
+
     data = get_iotawatt_sensor_data()
 
+    # A cache hit in get_iotawatt_sensor_data hands back the same data, keep the existing files
+    if data is _generated_data:
+        print("Sensor data unchanged, skipping rendering")
+        return
+
     # Shows all the sources
     # print(data.keys())
 
-    shutil.rmtree(output_dir, ignore_errors=True)
+    # Overwrite the previous cycle's files in place, only removing those for
+    # sources that no longer exist
     os.makedirs(output_dir, exist_ok=True)
+    base_names = ["all"] + [f"source_{source}" for source in data]
+    current = {f"{base_name}.{ext}" for base_name in base_names for ext in ("png", "svg")}
+    for f in os.listdir(output_dir):
+        if f not in current:
+            os.remove(f"{output_dir}/{f}")
+
+    # Normalise once and render every graph from the same plot
+    plot = prepare_plot(data)
+
+    # Set up rsvg-convert and format the SVG points before the workers race to
+    if use_svg():
+        get_rsvg_convert()
+        plot.points
 
-    base_name = f"{output_dir}/all"
-    svg_file = f"{base_name}.svg"
-    png_file = f"{base_name}.png"
-    with open(svg_file, "w") as f:
-        f.write(generate_svg(data))
-    convert_svg_to_png(svg_file, png_file)
+    # Each graph is independent. The expensive part runs outside the GIL on
+    # either path: rsvg-convert in its own process, or Pillow's PNG encoder.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [executor.submit(generate_graph, plot, f"{output_dir}/all")]
+        for source in data:
+            futures.append(executor.submit(generate_graph, plot, f"{output_dir}/source_{source}", source))
+        for future in futures:
+            future.result()
 
-    for source in data:
-        base_name = f"{output_dir}/source_{source}"
-        svg_file = f"{base_name}.svg"
-        png_file = f"{base_name}.png"
+    _generated_data = data
 
-        with open(svg_file, "w") as f:
-            f.write(generate_svg(data, only_source=source))
-        convert_svg_to_png(svg_file, png_file)
 
+def use_svg() -> bool:
+    # Pillow draws the PNGs directly, the SVG path is the fallback and for debugging
+    return Image is None or KEEP_SVG
 
-def convert_svg_to_png(svg_file: str, png_file: str):
-    if os.path.exists("/tmp/rsvg-convert-lib") is False:
+
+def generate_graph(plot: Plot, base_name: str, only_source: Optional[str] = None):
+    if not use_svg():
+        render_png(plot, f"{base_name}.png", only_source=only_source)
+        return
+
+    svg = render_svg(plot, only_source=only_source)
+
+    # The SVG is piped straight to rsvg-convert, only keep it when debugging
+    if KEEP_SVG:
+        with open(f"{base_name}.svg", "w") as f:
+            f.write(svg)
+
+    convert_svg_to_png(svg, f"{base_name}.png")
+
+
+@lru_cache(maxsize=1)
+def get_rsvg_convert() -> str:
+    dest = "/tmp/rsvg-convert-lib"
+    if os.path.exists(dest) is False:
         source = get_script_dir() + "/../external/rsvg-convert-lib"
-        dest = "/tmp/rsvg-convert-lib"
         shutil.copytree(source, dest)
+    return f"{dest}/rsvg-convert"
 
+
+def convert_svg_to_png(svg: str, png_file: str):
+    # With no input file rsvg-convert reads the SVG from stdin
     subprocess.run(
         [
-            "/tmp/rsvg-convert-lib/rsvg-convert",
+            get_rsvg_convert(),
             "-o",
             png_file,
-            svg_file,
-        ]
+        ],
+        input=svg.encode(),
     )
 
 